@@ -8,9 +8,42 @@ import mediapipe as mp
 import numpy as np
 import os
 import argparse
-import csv
+import sys
 from datetime import datetime
 
+# Add src to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from utils import HUDCache, hand_to_array, draw_landmarks_on_frame
+
+# CSV column names: h{hand}_l{landmark}_{axis} for 2 hands x 21 landmarks
+CSV_HEADER = tuple(
+    f'h{hand_idx}_l{landmark_idx}_{axis}'
+    for hand_idx in range(2)
+    for landmark_idx in range(21)
+    for axis in ('x', 'y', 'z')
+)
+
+
+def draw_collection_hud(layer, sign, collecting, collected_samples, target_samples):
+    """Draw sign name, collection status and progress bar onto the HUD layer."""
+    status_color = (0, 255, 0) if collecting else (0, 0, 255)
+    status_text = "COLLECTING" if collecting else "PAUSED"
+    
+    cv2.putText(layer, f"Sign: {sign}", (10, 30),
+               cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+    cv2.putText(layer, f"Status: {status_text}", (10, 70),
+               cv2.FONT_HERSHEY_SIMPLEX, 1, status_color, 2)
+    cv2.putText(layer, f"Samples: {collected_samples}/{target_samples}", (10, 110),
+               cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+    
+    # Draw progress bar
+    progress = min(collected_samples / target_samples, 1.0)
+    bar_width = int(600 * progress)
+    cv2.rectangle(layer, (10, 130), (610, 160), (50, 50, 50), -1)
+    cv2.rectangle(layer, (10, 130), (10 + bar_width, 160), (0, 255, 0), -1)
+    cv2.putText(layer, f"{int(progress * 100)}%", (620, 155),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+
 
 def main():
     parser = argparse.ArgumentParser(description='Collect ISL sign data')
@@ -24,7 +57,6 @@ def main():
     
     # Initialize MediaPipe Hands
     mp_hands = mp.solutions.hands
-    mp_drawing = mp.solutions.drawing_utils
     hands = mp_hands.Hands(
         static_image_mode=False,
         max_num_hands=2,
@@ -43,11 +75,12 @@ def main():
     cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
     cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
     cap.set(cv2.CAP_PROP_FPS, 30)
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Always process the newest frame
     
     # Data collection variables
     collecting = False
     collected_samples = 0
-    data_samples = []
+    data_samples = np.zeros((args.samples, 126), dtype=np.float32)
     
     print(f"=== ISL Data Collection ===")
     print(f"Sign: {args.sign}")
@@ -59,6 +92,14 @@ def main():
     print("  - Try different angles and distances")
     print("\nWaiting for 'S' to start...")
     
+    # Cached HUD layers
+    status_hud = HUDCache()
+    help_hud = HUDCache()
+    
+    # Per-frame output buffers, reused to avoid reallocating full frames
+    mirrored = None
+    frame_rgb = None
+    
     while True:
         ret, frame = cap.read()
         if not ret:
@@ -66,69 +107,47 @@ def main():
             break
         
         # Flip frame horizontally for mirror effect
-        frame = cv2.flip(frame, 1)
+        mirrored = cv2.flip(frame, 1, mirrored)
+        frame = mirrored
         
         # Convert BGR to RGB for MediaPipe
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, frame_rgb)
         
         # Process the frame with MediaPipe
         results = hands.process(frame_rgb)
         
         # Draw landmarks
+        draw_landmarks_on_frame(frame, results)
+        
         if results.multi_hand_landmarks:
-            for hand_landmarks in results.multi_hand_landmarks:
-                mp_drawing.draw_landmarks(
-                    frame,
-                    hand_landmarks,
-                    mp_hands.HAND_CONNECTIONS,
-                    mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2, circle_radius=2),
-                    mp_drawing.DrawingSpec(color=(255, 0, 0), thickness=2)
-                )
-            
             # Collect data if collecting is active
             if collecting and collected_samples < args.samples:
-                landmarks = []
-                
-                # Extract landmarks from up to 2 hands
-                for i in range(min(2, len(results.multi_hand_landmarks))):
-                    hand_landmarks = results.multi_hand_landmarks[i]
-                    for landmark in hand_landmarks.landmark:
-                        landmarks.extend([landmark.x, landmark.y, landmark.z])
-                
-                # Pad with zeros if only one hand detected
-                while len(landmarks) < 126:
-                    landmarks.append(0.0)
-                
-                # Store only first 126 features
-                data_samples.append(landmarks[:126])
+                # Fill this sample's row from up to 2 hands
+                # (a missing second hand stays zero-padded)
+                sample = data_samples[collected_samples]
+                for i, hand_landmarks in enumerate(results.multi_hand_landmarks[:2]):
+                    sample[i * 63:(i + 1) * 63] = hand_to_array(hand_landmarks)
                 collected_samples += 1
                 
                 # Show progress
                 if collected_samples % 10 == 0:
                     print(f"Collected: {collected_samples}/{args.samples}")
         
-        # Display information on frame
-        status_color = (0, 255, 0) if collecting else (0, 0, 255)
-        status_text = "COLLECTING" if collecting else "PAUSED"
-        
-        cv2.putText(frame, f"Sign: {args.sign}", (10, 30),
-                   cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-        cv2.putText(frame, f"Status: {status_text}", (10, 70),
-                   cv2.FONT_HERSHEY_SIMPLEX, 1, status_color, 2)
-        cv2.putText(frame, f"Samples: {collected_samples}/{args.samples}", (10, 110),
-                   cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-        
-        # Draw progress bar
-        progress = min(collected_samples / args.samples, 1.0)
-        bar_width = int(600 * progress)
-        cv2.rectangle(frame, (10, 130), (610, 160), (50, 50, 50), -1)
-        cv2.rectangle(frame, (10, 130), (10 + bar_width, 160), (0, 255, 0), -1)
-        cv2.putText(frame, f"{int(progress * 100)}%", (620, 155),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-        
-        # Instructions
-        cv2.putText(frame, "Press 'S' to start/stop, 'Q' to quit", (10, 460),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
+        # Display information on frame (re-rendered only when it changes)
+        status_hud.draw(
+            frame[0:170],
+            (collecting, collected_samples),
+            lambda layer: draw_collection_hud(layer, args.sign, collecting,
+                                              collected_samples, args.samples)
+        )
+        
+        # Instructions (static, rendered once)
+        help_hud.draw(
+            frame[440:475],
+            None,
+            lambda layer: cv2.putText(layer, "Press 'S' to start/stop, 'Q' to quit", (10, 20),
+                                      cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
+        )
         
         # Show frame
         cv2.imshow('ISL Data Collection', frame)
@@ -156,6 +175,9 @@ def main():
     cv2.destroyAllWindows()
     hands.close()
     
+    # Keep only the rows that were actually filled
+    data_samples = data_samples[:collected_samples]
+    
     # Save data to CSV
     if len(data_samples) > 0:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -163,22 +185,9 @@ def main():
         
         print(f"\nSaving {len(data_samples)} samples to {filename}...")
         
-        with open(filename, 'w', newline='') as csvfile:
-            writer = csv.writer(csvfile)
-            
-            # Write header
-            header = []
-            for hand_idx in range(2):
-                for landmark_idx in range(21):
-                    header.extend([
-                        f'h{hand_idx}_l{landmark_idx}_x',
-                        f'h{hand_idx}_l{landmark_idx}_y',
-                        f'h{hand_idx}_l{landmark_idx}_z'
-                    ])
-            writer.writerow(header)
-            
-            # Write data
-            writer.writerows(data_samples)
+        # Write header and all samples in one vectorized pass
+        np.savetxt(filename, data_samples, delimiter=',', fmt='%.6f',
+                   header=','.join(CSV_HEADER), comments='')
         
         print(f"✓ Data saved successfully!")
         print(f"  File: {filename}")
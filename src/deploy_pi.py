@@ -8,6 +8,7 @@ import cv2
 import mediapipe as mp
 import pyttsx3
 import threading
+import queue
 import time
 import json
 import os
@@ -17,7 +18,8 @@ import subprocess
 
 # Add src to path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from utils import normalize_landmarks, load_tflite_model, predict_tflite
+from utils import (normalize_landmarks, hand_to_array, load_tflite_model,
+                   predict_tflite_top1, LatestFrame)
 
 
 class TTSEngine:
@@ -32,27 +34,33 @@ class TTSEngine:
             logging.warning(f"Could not initialize espeak, falling back to default: {e}")
             self.engine = pyttsx3.init()
         
-        self.lock = threading.Lock()
-        self.is_speaking = False
+        # Single persistent worker; at most one announcement waits in line
+        self.queue = queue.Queue(maxsize=1)
+        self.thread = threading.Thread(target=self._worker, daemon=True)
+        self.thread.start()
     
     def speak(self, text):
-        """Speak text in a separate thread."""
-        if not self.is_speaking:
-            thread = threading.Thread(target=self._speak_thread, args=(text,))
-            thread.daemon = True
-            thread.start()
+        """Queue text to be spoken (dropped if one is already waiting)."""
+        try:
+            self.queue.put_nowait(text)
+        except queue.Full:
+            pass
     
-    def _speak_thread(self, text):
+    def _worker(self):
+        """Internal loop that speaks queued text."""
+        # Prewarm so voice loading doesn't delay the first announcement
+        self._say('')
+        
+        while True:
+            self._say(self.queue.get())
+    
+    def _say(self, text):
         """Internal method to speak text."""
-        with self.lock:
-            self.is_speaking = True
-            try:
-                self.engine.say(text)
-                self.engine.runAndWait()
-            except Exception as e:
-                logging.error(f"TTS Error: {e}")
-            finally:
-                self.is_speaking = False
+        try:
+            self.engine.say(text)
+            self.engine.runAndWait()
+        except Exception as e:
+            logging.error(f"TTS Error: {e}")
 
 
 class PiCamera:
@@ -81,6 +89,7 @@ class PiCamera:
             self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
             self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
             self.cap.set(cv2.CAP_PROP_FPS, 30)
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Avoid stale queued frames
     
     def read(self):
         """Read a frame from camera."""
@@ -118,27 +127,63 @@ def setup_bluetooth_audio():
         return False
 
 
-def extract_landmarks_pi(frame, hands):
-    """Extract hand landmarks optimized for Pi."""
+# Reused landmark buffer (2 hands x 21 landmarks x 3 coords)
+_LM_BUF = np.zeros(126, dtype=np.float32)
+
+# Motion gate state: downscaled grayscale of the last processed frame,
+# the landmarks MediaPipe produced for it, and how many frames in a row
+# have reused them
+_prev_small = None
+_prev_landmarks = None
+_skipped = 0
+
+
+def extract_landmarks_pi(frame, hands, motion_threshold=0.0, max_skip=5):
+    """
+    Extract hand landmarks optimized for Pi.
+    
+    If the frame barely differs from the previous one (mean absolute
+    difference per pixel of an 80x60 grayscale thumbnail below
+    motion_threshold) and hands were found last time, the previous
+    landmarks are reused without running MediaPipe. At most max_skip
+    frames in a row are reused, so small motions (e.g. only fingers) that
+    stay under the threshold are still picked up. A threshold of 0
+    disables the gate.
+    """
+    global _prev_small, _prev_landmarks, _skipped
+    
+    if motion_threshold > 0:
+        small = cv2.cvtColor(
+            cv2.resize(frame, (80, 60), interpolation=cv2.INTER_AREA),
+            cv2.COLOR_BGR2GRAY
+        )
+        if (_prev_landmarks is not None and _prev_small is not None
+                and _skipped < max_skip):
+            diff = cv2.norm(small, _prev_small, cv2.NORM_L1) / small.size
+            if diff < motion_threshold:
+                _skipped += 1
+                return _prev_landmarks
+        _prev_small = small
+    
+    _skipped = 0
+    
     frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
     results = hands.process(frame_rgb)
     
     if results.multi_hand_landmarks:
-        landmarks = []
+        detected = results.multi_hand_landmarks[:2]
         
-        for i in range(min(2, len(results.multi_hand_landmarks))):
-            hand_landmarks = results.multi_hand_landmarks[i]
-            for landmark in hand_landmarks.landmark:
-                landmarks.extend([landmark.x, landmark.y, landmark.z])
+        for i, hand_landmarks in enumerate(detected):
+            _LM_BUF[i * 63:(i + 1) * 63] = hand_to_array(hand_landmarks)
         
-        while len(landmarks) < 126:
-            landmarks.append(0.0)
+        # Zero the slot of a missing second hand
+        _LM_BUF[len(detected) * 63:] = 0.0
         
-        landmarks_array = np.array(landmarks[:126], dtype=np.float32)
-        normalized = normalize_landmarks(landmarks_array)
-        
-        return normalized
+        # normalize_landmarks returns a copy, so the buffer can be reused
+        _prev_landmarks = normalize_landmarks(_LM_BUF)
+        return _prev_landmarks
     
+    _prev_landmarks = None
     return None
 
 
@@ -173,7 +218,10 @@ def main():
             'speech_volume': 0.9,
             'pi_camera_width': 320,
             'pi_camera_height': 240,
-            'tflite_model_path': 'models/isl_model.tflite',
+            'motion_threshold': 2.0,
+            'motion_max_skip': 5,
+            'tflite_model_path': 'models/isl_model_int8.tflite',
+            'tflite_threads': 2,
             'labels_path': 'models/labels.npy'
         }
     
@@ -184,7 +232,11 @@ def main():
     # Load TFLite model
     logging.info("Loading TFLite model...")
     try:
-        interpreter = load_tflite_model(config['tflite_model_path'])
+        # Two TFLite threads leaves the other Pi cores for MediaPipe and capture
+        interpreter = load_tflite_model(
+            config['tflite_model_path'],
+            num_threads=config.get('tflite_threads', 2)
+        )
         labels = np.load(config['labels_path'], allow_pickle=True)
         logging.info(f"Model loaded with {len(labels)} classes")
         logging.info(f"Classes: {list(labels)}")
@@ -219,55 +271,63 @@ def main():
         width=config.get('pi_camera_width', 320),
         height=config.get('pi_camera_height', 240)
     )
+    
+    # Capture frames on a background thread, keeping only the newest
+    stream = LatestFrame(camera).start()
     logging.info("Camera ready")
     
     # Recognition variables
-    stability_buffer = []
+    stable_sign = None  # Sign seen on consecutive frames
+    stable_count = 0    # Number of consecutive frames with stable_sign
     last_announced_sign = None
     last_announcement_time = 0
     
     confidence_threshold = config.get('confidence_threshold', 0.7)
     stability_frames = config.get('stability_frames', 15)
     cooldown_seconds = config.get('cooldown_seconds', 3)
+    motion_threshold = config.get('motion_threshold', 2.0)
+    motion_max_skip = config.get('motion_max_skip', 5)
     
     logging.info("Smart Glasses running!")
     logging.info("Press Ctrl+C to stop")
     
     frame_count = 0
     fps_start = time.time()
+    camera_failed = False
     
     try:
         while True:
-            ret, frame = camera.read()
+            ret, frame = stream.read()
             if not ret:
-                logging.error("Failed to capture frame")
-                time.sleep(0.1)
+                # stream.read() already waited for a frame, no extra sleep
+                # needed; only give up once the camera has actually failed
+                if stream.failed:
+                    logging.error(f"Failed to capture frame: {stream.error or 'camera stalled'}")
+                    camera_failed = True
+                    break
                 continue
             
             frame_count += 1
             
             # Extract landmarks
-            landmarks = extract_landmarks_pi(frame, hands)
+            landmarks = extract_landmarks_pi(frame, hands, motion_threshold, motion_max_skip)
             
             if landmarks is not None:
                 # Predict using TFLite
-                prediction = predict_tflite(interpreter, landmarks)
-                
-                max_idx = np.argmax(prediction)
-                confidence = float(prediction[max_idx])
+                max_idx, confidence = predict_tflite_top1(interpreter, landmarks)
                 
                 if confidence >= confidence_threshold:
                     predicted_sign = labels[max_idx]
                     
-                    # Add to stability buffer
-                    stability_buffer.append(predicted_sign)
-                    
-                    if len(stability_buffer) > stability_frames:
-                        stability_buffer.pop(0)
+                    # Count consecutive frames with the same sign
+                    if predicted_sign == stable_sign:
+                        stable_count += 1
+                    else:
+                        stable_sign = predicted_sign
+                        stable_count = 1
                     
-                    # Check if buffer is stable
-                    if len(stability_buffer) == stability_frames and \
-                       all(s == predicted_sign for s in stability_buffer):
+                    # Check if the sign has been stable long enough
+                    if stable_count >= stability_frames:
                         
                         current_time = time.time()
                         
@@ -280,11 +340,13 @@ def main():
                             
                             last_announced_sign = predicted_sign
                             last_announcement_time = current_time
-                            stability_buffer.clear()
+                            stable_count = 0
                 else:
-                    stability_buffer.clear()
+                    stable_sign = None
+                    stable_count = 0
             else:
-                stability_buffer.clear()
+                stable_sign = None
+                stable_count = 0
             
             # Log FPS every 30 frames
             if frame_count % 30 == 0:
@@ -292,9 +354,6 @@ def main():
                 fps = 30 / elapsed
                 logging.info(f"FPS: {fps:.1f}")
                 fps_start = time.time()
-            
-            # Small delay to prevent CPU overload
-            time.sleep(0.01)
     
     except KeyboardInterrupt:
         logging.info("Interrupted by user")
@@ -306,9 +365,14 @@ def main():
     
     finally:
         logging.info("Shutting down...")
+        stream.stop()
         camera.release()
         hands.close()
         logging.info("Cleanup complete")
+    
+    # Exit non-zero so systemd (Restart=on-failure) restarts the service
+    if camera_failed:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
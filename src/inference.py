@@ -8,7 +8,9 @@ import mediapipe as mp
 import numpy as np
 import pyttsx3
 import threading
+import queue
 import time
+import math
 import argparse
 import json
 import sys
@@ -16,7 +18,12 @@ import os
 
 # Add src to path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from utils import extract_landmarks, load_model_and_labels, draw_landmarks_on_frame
+from utils import (draw_landmarks_on_frame, load_model_and_labels, LatestFrame,
+                   HandTracker, HUDCache, AsyncHandLandmarker)
+
+
+# Width of the frame passed to MediaPipe (aspect ratio is preserved)
+PROCESS_WIDTH = 320
 
 
 class TTSEngine:
@@ -26,33 +33,75 @@ class TTSEngine:
         self.engine = pyttsx3.init()
         self.engine.setProperty('rate', rate)
         self.engine.setProperty('volume', volume)
-        self.lock = threading.Lock()
-        self.is_speaking = False
+        # Single persistent worker; at most one announcement waits in line
+        self.queue = queue.Queue(maxsize=1)
+        self.thread = threading.Thread(target=self._worker, daemon=True)
+        self.thread.start()
     
     def speak(self, text):
-        """Speak text in a separate thread."""
-        if not self.is_speaking:
-            thread = threading.Thread(target=self._speak_thread, args=(text,))
-            thread.daemon = True
-            thread.start()
+        """Queue text to be spoken (dropped if one is already waiting)."""
+        try:
+            self.queue.put_nowait(text)
+        except queue.Full:
+            pass
+    
+    def _worker(self):
+        """Internal loop that speaks queued text."""
+        # Prewarm so voice loading doesn't delay the first announcement
+        self._say('')
+        
+        while True:
+            self._say(self.queue.get())
     
-    def _speak_thread(self, text):
+    def _say(self, text):
         """Internal method to speak text."""
-        with self.lock:
-            self.is_speaking = True
-            try:
-                self.engine.say(text)
-                self.engine.runAndWait()
-            except Exception as e:
-                print(f"TTS Error: {e}")
-            finally:
-                self.is_speaking = False
+        try:
+            self.engine.say(text)
+            self.engine.runAndWait()
+        except Exception as e:
+            print(f"TTS Error: {e}")
+
+
+def draw_status_hud(layer, predicted_sign, confidence_text, stable_shown,
+                    stability_frames, cooldown_text, current_fps):
+    """Draw sign, stability, cooldown and FPS information onto the HUD layer."""
+    display_width = layer.shape[1]
+    
+    # Display predicted sign
+    if predicted_sign:
+        cv2.putText(layer, f"Sign: {predicted_sign}", (10, 40),
+                   cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 255, 0), 2)
+        cv2.putText(layer, confidence_text, (10, 80),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+    else:
+        cv2.putText(layer, "Sign: ---", (10, 40),
+                   cv2.FONT_HERSHEY_SIMPLEX, 1.2, (128, 128, 128), 2)
+    
+    # Display stability bar
+    stability_progress = stable_shown / stability_frames
+    bar_width = int(300 * stability_progress)
+    cv2.rectangle(layer, (10, 100), (310, 120), (50, 50, 50), -1)
+    if bar_width > 0:
+        cv2.rectangle(layer, (10, 100), (10 + bar_width, 120), (0, 255, 255), -1)
+    cv2.putText(layer, f"Stability: {stable_shown}/{stability_frames}",
+               (10, 140), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+    
+    # Display cooldown indicator
+    if cooldown_text:
+        cv2.putText(layer, cooldown_text, (display_width - 200, 40),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 165, 255), 2)
+    
+    # Display FPS
+    cv2.putText(layer, f"FPS: {current_fps}", (display_width - 150, 80),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
 
 
 def main():
     parser = argparse.ArgumentParser(description='Real-time ISL recognition with TTS')
     parser.add_argument('--config', type=str, default='config.json', help='Configuration file')
     parser.add_argument('--camera', type=int, default=0, help='Camera index')
+    parser.add_argument('--headless', action='store_true',
+                        help='Run without a display window (stop with Ctrl+C)')
     args = parser.parse_args()
     
     # Load configuration
@@ -70,7 +119,8 @@ def main():
             'camera_width': 640,
             'camera_height': 480,
             'model_path': 'models/isl_model.keras',
-            'labels_path': 'models/labels.npy'
+            'labels_path': 'models/labels.npy',
+            'hand_landmarker_path': 'models/hand_landmarker.task'
         }
     
     print("=== ISL Real-time Recognition ===\n")
@@ -97,14 +147,26 @@ def main():
     )
     print("✓ TTS ready\n")
     
-    # Initialize MediaPipe Hands
-    mp_hands = mp.solutions.hands
-    hands = mp_hands.Hands(
-        static_image_mode=False,
-        max_num_hands=2,
-        min_detection_confidence=0.7,
-        min_tracking_confidence=0.5
-    )
+    # Initialize MediaPipe hand tracking. Prefer the Tasks HandLandmarker
+    # in LIVE_STREAM mode (runs on its own thread) when its model is present.
+    landmarker_path = config.get('hand_landmarker_path', 'models/hand_landmarker.task')
+    if os.path.exists(landmarker_path):
+        hands = AsyncHandLandmarker(
+            landmarker_path,
+            num_hands=2,
+            min_detection_confidence=0.7,
+            min_tracking_confidence=0.5
+        )
+        print("✓ Using MediaPipe HandLandmarker (live stream)\n")
+    else:
+        mp_hands = mp.solutions.hands
+        hands = mp_hands.Hands(
+            static_image_mode=False,
+            max_num_hands=2,
+            min_detection_confidence=0.7,
+            min_tracking_confidence=0.5,
+            model_complexity=0  # Lite model, same as deploy_pi.py
+        )
     
     # Open webcam
     cap = cv2.VideoCapture(args.camera)
@@ -117,9 +179,18 @@ def main():
     cap.set(cv2.CAP_PROP_FRAME_WIDTH, config.get('camera_width', 640))
     cap.set(cv2.CAP_PROP_FRAME_HEIGHT, config.get('camera_height', 480))
     cap.set(cv2.CAP_PROP_FPS, 30)
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Always process the newest frame
+    
+    # Capture frames on a background thread, keeping only the newest
+    stream = LatestFrame(cap).start()
+    
+    # Track hands on a second thread on a downscaled, mirrored copy;
+    # landmarks are normalized, so results still draw on the full frame
+    tracker = HandTracker(stream, hands, process_width=PROCESS_WIDTH, mirror=True).start()
     
     # Recognition variables
-    stability_buffer = []
+    stable_sign = None  # Sign seen on consecutive frames
+    stable_count = 0    # Number of consecutive frames with stable_sign
     last_announced_sign = None
     last_announcement_time = 0
     
@@ -129,34 +200,41 @@ def main():
     
     print("Instructions:")
     print("  - Show ISL signs to the camera")
-    print("  - Press 'R' to reset buffer")
-    print("  - Press 'Q' to quit")
+    if args.headless:
+        print("  - Press Ctrl+C to quit")
+    else:
+        print("  - Press 'R' to reset buffer")
+        print("  - Press 'Q' to quit")
     print("\nStarting inference...\n")
     
+    # Mirrored display frame, reused to avoid reallocating full frames
+    mirrored = None
+    
+    # Cached HUD layers
+    status_hud = HUDCache()
+    help_hud = HUDCache()
+    
     fps_counter = 0
     fps_start_time = time.time()
     current_fps = 0
     
     try:
         while True:
-            ret, frame = cap.read()
+            ret, frame, landmarks, results = tracker.read()
             if not ret:
-                print("Error: Failed to capture frame")
-                break
-            
-            # Flip frame horizontally
-            frame = cv2.flip(frame, 1)
-            
-            # Extract landmarks
-            landmarks = extract_landmarks(frame, hands)
+                # A slow or briefly stalled camera is not fatal
+                if stream.failed:
+                    print(f"Error: Failed to capture frame: {stream.error or 'camera stalled'}")
+                    break
+                if tracker.failed:
+                    print(f"Error: Hand tracking failed: {tracker.error}")
+                    break
+                continue
             
             predicted_sign = None
             confidence = 0.0
             
             if landmarks is not None:
-                # Draw landmarks
-                frame = draw_landmarks_on_frame(frame, hands)
-                
                 # Predict
                 landmarks_input = landmarks.reshape(1, -1)
                 prediction = model.predict(landmarks_input, verbose=0)[0]
@@ -167,16 +245,15 @@ def main():
                 if confidence >= confidence_threshold:
                     predicted_sign = labels[max_idx]
                     
-                    # Add to stability buffer
-                    stability_buffer.append(predicted_sign)
-                    
-                    # Keep buffer at stability_frames length
-                    if len(stability_buffer) > stability_frames:
-                        stability_buffer.pop(0)
+                    # Count consecutive frames with the same sign
+                    if predicted_sign == stable_sign:
+                        stable_count += 1
+                    else:
+                        stable_sign = predicted_sign
+                        stable_count = 1
                     
-                    # Check if buffer is stable (all same sign)
-                    if len(stability_buffer) == stability_frames and \
-                       all(s == predicted_sign for s in stability_buffer):
+                    # Check if the sign has been stable long enough
+                    if stable_count >= stability_frames:
                         
                         current_time = time.time()
                         
@@ -191,14 +268,16 @@ def main():
                             last_announced_sign = predicted_sign
                             last_announcement_time = current_time
                             
-                            # Clear buffer after announcement
-                            stability_buffer.clear()
+                            # Reset counter after announcement
+                            stable_count = 0
                 else:
-                    # Low confidence, clear buffer
-                    stability_buffer.clear()
+                    # Low confidence, reset counter
+                    stable_sign = None
+                    stable_count = 0
             else:
-                # No hands detected, clear buffer
-                stability_buffer.clear()
+                # No hands detected, reset counter
+                stable_sign = None
+                stable_count = 0
             
             # Calculate FPS
             fps_counter += 1
@@ -207,51 +286,50 @@ def main():
                 fps_counter = 0
                 fps_start_time = time.time()
             
-            # Display information
-            display_height = frame.shape[0]
-            display_width = frame.shape[1]
+            # Headless mode: skip all drawing, display and key handling
+            if args.headless:
+                continue
             
-            # Dark overlay for text
-            overlay = frame.copy()
-            cv2.rectangle(overlay, (0, 0), (display_width, 150), (0, 0, 0), -1)
-            frame = cv2.addWeighted(overlay, 0.3, frame, 0.7, 0)
+            # Flip frame horizontally and draw the tracked hands
+            mirrored = cv2.flip(frame, 1, mirrored)
+            frame = mirrored
+            draw_landmarks_on_frame(frame, results)
             
-            # Display predicted sign
-            if predicted_sign and confidence >= confidence_threshold:
-                cv2.putText(frame, f"Sign: {predicted_sign}", (10, 40),
-                           cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 255, 0), 2)
-                cv2.putText(frame, f"Confidence: {confidence:.1%}", (10, 80),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
-            else:
-                cv2.putText(frame, "Sign: ---", (10, 40),
-                           cv2.FONT_HERSHEY_SIMPLEX, 1.2, (128, 128, 128), 2)
+            # Display information
+            display_height = frame.shape[0]
             
-            # Display stability bar
-            stability_progress = len(stability_buffer) / stability_frames
-            bar_width = int(300 * stability_progress)
-            cv2.rectangle(frame, (10, 100), (310, 120), (50, 50, 50), -1)
-            if bar_width > 0:
-                cv2.rectangle(frame, (10, 100), (10 + bar_width, 120), (0, 255, 255), -1)
-            cv2.putText(frame, f"Stability: {len(stability_buffer)}/{stability_frames}",
-                       (10, 140), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+            # Dark overlay for text (darken the top strip in place,
+            # same as a 30% black blend)
+            top = frame[0:150]
+            cv2.convertScaleAbs(top, top, alpha=0.7)
             
-            # Display cooldown indicator
-            current_time = time.time()
-            time_since_last = current_time - last_announcement_time
+            # HUD text is only re-rendered when the displayed values change,
+            # so show confidence in whole percent and the cooldown in 0.5 s
+            # steps to keep it from changing on every frame
+            stable_shown = min(stable_count, stability_frames)
+            time_since_last = time.time() - last_announcement_time
+            cooldown_text = None
             if time_since_last < cooldown_seconds:
-                cooldown_remaining = cooldown_seconds - time_since_last
-                cv2.putText(frame, f"Cooldown: {cooldown_remaining:.1f}s",
-                           (display_width - 200, 40),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 165, 255), 2)
+                cooldown_left = math.ceil((cooldown_seconds - time_since_last) * 2) / 2
+                cooldown_text = f"Cooldown: {cooldown_left:.1f}s"
+            confidence_text = f"Confidence: {confidence:.0%}" if predicted_sign else None
             
-            # Display FPS
-            cv2.putText(frame, f"FPS: {current_fps}", (display_width - 150, 80),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+            status_hud.draw(
+                top,
+                (predicted_sign, confidence_text, stable_shown, cooldown_text, current_fps),
+                lambda layer: draw_status_hud(
+                    layer, predicted_sign, confidence_text, stable_shown,
+                    stability_frames, cooldown_text, current_fps
+                )
+            )
             
-            # Instructions
-            cv2.putText(frame, "Press 'R' to reset, 'Q' to quit",
-                       (10, display_height - 20),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
+            # Instructions (static, rendered once)
+            help_hud.draw(
+                frame[display_height - 40:display_height],
+                None,
+                lambda layer: cv2.putText(layer, "Press 'R' to reset, 'Q' to quit", (10, 20),
+                                          cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
+            )
             
             # Show frame
             cv2.imshow('ISL Recognition', frame)
@@ -263,7 +341,8 @@ def main():
                 print("\nQuitting...")
                 break
             elif key == ord('r') or key == ord('R'):
-                stability_buffer.clear()
+                stable_sign = None
+                stable_count = 0
                 last_announced_sign = None
                 print("Buffer reset")
     
@@ -272,8 +351,11 @@ def main():
     
     finally:
         # Cleanup
+        tracker.stop()
+        stream.stop()
         cap.release()
-        cv2.destroyAllWindows()
+        if not args.headless:
+            cv2.destroyAllWindows()
         hands.close()
         print("Cleanup complete")
 
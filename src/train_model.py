@@ -4,10 +4,12 @@ Trains a neural network classifier on collected landmark data.
 """
 
 import os
+import shutil
+import tempfile
 import numpy as np
-import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder
+import tensorflow as tf
 from tensorflow import keras
 from tensorflow.keras import layers
 from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
@@ -20,9 +22,6 @@ def load_data(data_dir):
     """Load all CSV files from data directory."""
     print("Loading data...")
     
-    X = []
-    y = []
-    
     csv_files = [f for f in os.listdir(data_dir) if f.endswith('.csv')]
     
     if len(csv_files) == 0:
@@ -30,34 +29,45 @@ def load_data(data_dir):
     
     print(f"Found {len(csv_files)} sign classes:")
     
+    # First pass: read each class as a float32 array
+    parts = []
     for csv_file in csv_files:
         # Extract label from filename (without .csv extension)
         label = csv_file.replace('.csv', '')
         
-        # Load CSV
+        # Load CSV (skip the header row)
         filepath = os.path.join(data_dir, csv_file)
-        df = pd.read_csv(filepath)
-        
-        # Extract features (skip header)
-        features = df.values
+        features = np.loadtxt(filepath, delimiter=',', skiprows=1,
+                              dtype=np.float32, ndmin=2)
         
         print(f"  - {label}: {len(features)} samples")
-        
-        # Add to dataset
-        X.extend(features)
-        y.extend([label] * len(features))
-    
-    return np.array(X), np.array(y)
+        parts.append((label, features))
+    
+    # Second pass: copy into one preallocated dataset
+    total = sum(len(features) for _, features in parts)
+    X = np.empty((total, parts[0][1].shape[1]), dtype=np.float32)
+    y = np.empty(total, dtype=object)
+    
+    offset = 0
+    for label, features in parts:
+        n = len(features)
+        X[offset:offset + n] = features
+        y[offset:offset + n] = label
+        offset += n
+    
+    # Normalize every sample relative to each hand's wrist in one
+    # vectorized pass, matching normalize_landmarks at inference time
+    hands = X.reshape(-1, 2, 21, 3)
+    present = hands.reshape(-1, 2, 63).any(axis=2)
+    hands -= hands[:, :, 0:1, :] * present[:, :, None, None]
+    
+    return X, y
 
 
 def create_model(input_shape, num_classes):
     """Create neural network model."""
     model = keras.Sequential([
         layers.Input(shape=(input_shape,)),
-        layers.Dense(256, activation='relu'),
-        layers.BatchNormalization(),
-        layers.Dropout(0.3),
-        
         layers.Dense(128, activation='relu'),
         layers.BatchNormalization(),
         layers.Dropout(0.3),
@@ -65,7 +75,8 @@ def create_model(input_shape, num_classes):
         layers.Dense(64, activation='relu'),
         layers.Dropout(0.2),
         
-        layers.Dense(num_classes, activation='softmax')
+        # Keep the softmax in float32 for numerical safety under mixed precision
+        layers.Dense(num_classes, activation='softmax', dtype='float32')
     ])
     
     model.compile(
@@ -110,8 +121,16 @@ def main():
     parser.add_argument('--model_dir', type=str, default='models', help='Directory to save model')
     parser.add_argument('--epochs', type=int, default=100, help='Maximum number of epochs')
     parser.add_argument('--batch_size', type=int, default=32, help='Batch size')
+    parser.add_argument('--mixed_precision', type=str, choices=['bfloat16', 'float16'], default=None,
+                        help='Train with mixed precision (bfloat16 for CPUs with BF16 support, '
+                             'float16 for GPUs with tensor cores)')
     args = parser.parse_args()
     
+    # Mixed precision: compute in 16-bit, keep variables in float32
+    if args.mixed_precision:
+        keras.mixed_precision.set_global_policy(f'mixed_{args.mixed_precision}')
+        print(f"Using mixed precision: mixed_{args.mixed_precision}")
+    
     # Create models directory
     os.makedirs(args.model_dir, exist_ok=True)
     
@@ -161,28 +180,46 @@ def main():
         verbose=1
     )
     
+    # Input pipelines: cached tensors, reshuffled each epoch, prefetched
+    train_ds = (
+        tf.data.Dataset.from_tensor_slices((X_train, y_train))
+        .cache()
+        .shuffle(len(X_train), seed=42)
+        .batch(args.batch_size)
+        .prefetch(tf.data.AUTOTUNE)
+    )
+    val_ds = (
+        tf.data.Dataset.from_tensor_slices((X_test, y_test))
+        .cache()
+        .batch(args.batch_size)
+        .prefetch(tf.data.AUTOTUNE)
+    )
+    
     # Train model
     print("\nTraining model...")
     history = model.fit(
-        X_train, y_train,
-        validation_data=(X_test, y_test),
+        train_ds,
+        validation_data=val_ds,
         epochs=args.epochs,
-        batch_size=args.batch_size,
         callbacks=[early_stopping, reduce_lr],
         verbose=1
     )
     
     # Evaluate model
     print("\nEvaluating model...")
-    test_loss, test_accuracy = model.evaluate(X_test, y_test, verbose=0)
+    # Single forward pass; loss, accuracy and the report all derive from it
+    y_pred = model.predict(X_test, batch_size=256, verbose=0)
+    y_pred_classes = np.argmax(y_pred, axis=1)
+    y_test_classes = np.argmax(y_test, axis=1)
+    
+    # Categorical cross-entropy of the true class, as model.evaluate reports
+    true_probs = y_pred[np.arange(len(y_pred)), y_test_classes]
+    test_loss = float(-np.mean(np.log(np.clip(true_probs, 1e-7, 1.0))))
+    test_accuracy = float(np.mean(y_pred_classes == y_test_classes))
     print(f"Test Loss: {test_loss:.4f}")
     print(f"Test Accuracy: {test_accuracy:.4f}")
     
     # Detailed classification report
-    y_pred = model.predict(X_test, verbose=0)
-    y_pred_classes = np.argmax(y_pred, axis=1)
-    y_test_classes = np.argmax(y_test, axis=1)
-    
     from sklearn.metrics import classification_report, confusion_matrix
     
     print("\nClassification Report:")
@@ -196,6 +233,14 @@ def main():
     cm = confusion_matrix(y_test_classes, y_pred_classes)
     print(cm)
     
+    # Rebuild in float32 for saving and TFLite conversion (variables are
+    # already float32 under mixed precision, so weights copy over as-is)
+    if args.mixed_precision:
+        keras.mixed_precision.set_global_policy('float32')
+        float_model = create_model(X.shape[1], num_classes)
+        float_model.set_weights(model.get_weights())
+        model = float_model
+    
     # Save model
     model_path = os.path.join(args.model_dir, 'isl_model.keras')
     print(f"\nSaving model to {model_path}...")
@@ -212,10 +257,14 @@ def main():
     plot_path = os.path.join(args.model_dir, 'training_plot.png')
     plot_training_history(history, plot_path)
     
-    # Convert to TensorFlow Lite
+    # Convert to TensorFlow Lite. TF 2.16 ships Keras 3, whose models
+    # from_keras_model cannot convert, so go through an exported SavedModel.
     print("\nConverting to TensorFlow Lite...")
-    converter = keras.saving.TFLiteConverter.from_keras_model(model)
-    converter.optimizations = [keras.lite.Optimize.DEFAULT]
+    saved_model_dir = tempfile.mkdtemp(prefix='isl_saved_model_')
+    model.export(saved_model_dir)
+    
+    converter = tf.lite.TFLiteConverter.from_saved_model(saved_model_dir)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
     tflite_model = converter.convert()
     
     tflite_path = os.path.join(args.model_dir, 'isl_model.tflite')
@@ -227,11 +276,57 @@ def main():
     tflite_size = os.path.getsize(tflite_path) / 1024
     print(f"  TFLite model size: {tflite_size:.2f} KB")
     
+    # Full-integer INT8 model for the Pi (calibrated on training samples)
+    print("\nConverting to INT8 TensorFlow Lite...")
+    
+    calibration_idx = np.random.default_rng(42).choice(
+        len(X_train), size=min(100, len(X_train)), replace=False
+    )
+    
+    def representative_dataset():
+        for i in calibration_idx:
+            yield [X_train[i:i + 1].astype(np.float32)]
+    
+    converter_int8 = tf.lite.TFLiteConverter.from_saved_model(saved_model_dir)
+    converter_int8.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter_int8.representative_dataset = representative_dataset
+    converter_int8.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    converter_int8.inference_input_type = tf.int8
+    converter_int8.inference_output_type = tf.int8
+    tflite_int8_model = converter_int8.convert()
+    
+    tflite_int8_path = os.path.join(args.model_dir, 'isl_model_int8.tflite')
+    with open(tflite_int8_path, 'wb') as f:
+        f.write(tflite_int8_model)
+    print(f"✓ INT8 TFLite model saved to {tflite_int8_path}")
+    
+    tflite_int8_size = os.path.getsize(tflite_int8_path) / 1024
+    print(f"  INT8 TFLite model size: {tflite_int8_size:.2f} KB")
+    
+    # FP16 model for devices with a GPU delegate
+    print("\nConverting to FP16 TensorFlow Lite...")
+    converter_fp16 = tf.lite.TFLiteConverter.from_saved_model(saved_model_dir)
+    converter_fp16.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter_fp16.target_spec.supported_types = [tf.float16]
+    tflite_fp16_model = converter_fp16.convert()
+    
+    tflite_fp16_path = os.path.join(args.model_dir, 'isl_model_fp16.tflite')
+    with open(tflite_fp16_path, 'wb') as f:
+        f.write(tflite_fp16_model)
+    print(f"✓ FP16 TFLite model saved to {tflite_fp16_path}")
+    
+    tflite_fp16_size = os.path.getsize(tflite_fp16_path) / 1024
+    print(f"  FP16 TFLite model size: {tflite_fp16_size:.2f} KB")
+    
+    shutil.rmtree(saved_model_dir, ignore_errors=True)
+    
     print("\n=== Training Complete! ===")
     print(f"Final Test Accuracy: {test_accuracy:.2%}")
     print(f"Model: {model_path}")
     print(f"Labels: {labels_path}")
-    print(f"TFLite: {tflite_path}")
+    print(f"TFLite: {tflite_path} ({tflite_size:.2f} KB)")
+    print(f"TFLite (INT8): {tflite_int8_path} ({tflite_int8_size:.2f} KB)")
+    print(f"TFLite (FP16): {tflite_fp16_path} ({tflite_fp16_size:.2f} KB)")
 
 
 if __name__ == "__main__":
@@ -2,54 +2,136 @@
 Utility functions for Smart Glasses ISL Recognition System
 """
 
+import os
+import threading
+import queue
+import time
+import weakref
+from types import SimpleNamespace
 import numpy as np
 import cv2
 import mediapipe as mp
-from tensorflow import keras
+from mediapipe.framework.formats import landmark_pb2
 
 
-def extract_landmarks(frame, hands):
+# MediaPipe drawing helpers and styles, created once instead of per frame
+_MP_DRAWING = mp.solutions.drawing_utils
+_HAND_CONNECTIONS = mp.solutions.hands.HAND_CONNECTIONS
+_LANDMARK_SPEC = _MP_DRAWING.DrawingSpec(color=(0, 255, 0), thickness=2, circle_radius=2)
+_CONNECTION_SPEC = _MP_DRAWING.DrawingSpec(color=(255, 0, 0), thickness=2)
+
+
+def process_frame(frame, hands):
     """
-    Extract hand landmarks from a frame using MediaPipe Hands.
+    Run MediaPipe Hands once on a frame and extract landmarks.
     
     Args:
         frame: Input frame (BGR image)
         hands: MediaPipe Hands solution object
     
     Returns:
-        numpy array of shape (126,) containing normalized landmarks for both hands
-        or None if no hands detected
+        Tuple of (results, landmarks) where results is the raw MediaPipe
+        output (reusable for drawing) and landmarks is the normalized
+        (126,) array or None if no hands detected
     """
     # Convert BGR to RGB
     frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
     
+    # Read-only input lets MediaPipe use the buffer without copying it
+    frame_rgb.flags.writeable = False
+    
     # Process the frame
     results = hands.process(frame_rgb)
     
+    return results, extract_landmarks(frame, hands, results=results)
+
+
+def extract_and_annotate(frame, hands, draw=True, canvas=None):
+    """
+    Extract normalized landmarks and draw them, running MediaPipe once.
+    
+    Args:
+        frame: Input frame (BGR image) passed to MediaPipe
+        hands: MediaPipe Hands solution object
+        draw: Whether to draw the detected landmarks
+        canvas: Image to draw on (defaults to frame); may be a larger
+            version of frame since landmarks are normalized
+    
+    Returns:
+        Tuple of (landmarks, results) where landmarks is the normalized
+        (126,) array or None if no hands detected
+    """
+    results, landmarks = process_frame(frame, hands)
+    
+    if draw:
+        draw_landmarks_on_frame(frame if canvas is None else canvas, results)
+    
+    return landmarks, results
+
+
+def extract_landmarks(frame, hands, results=None):
+    """
+    Extract hand landmarks from a frame using MediaPipe Hands.
+    
+    Args:
+        frame: Input frame (BGR image)
+        hands: MediaPipe Hands solution object
+        results: Optional precomputed MediaPipe results for this frame;
+            when given, hands.process is not run again
+    
+    Returns:
+        numpy array of shape (126,) containing normalized landmarks for both hands
+        or None if no hands detected
+    """
+    if results is None:
+        results, landmarks = process_frame(frame, hands)
+        return landmarks
+    
     if results.multi_hand_landmarks:
-        landmarks = []
+        # Zero-filled, so a missing second hand is already padded
+        landmarks = np.zeros(126, dtype=np.float32)
         
-        # Process up to 2 hands
-        for i in range(min(2, len(results.multi_hand_landmarks))):
-            hand_landmarks = results.multi_hand_landmarks[i]
-            
-            # Extract x, y, z coordinates for all 21 landmarks
-            for landmark in hand_landmarks.landmark:
-                landmarks.extend([landmark.x, landmark.y, landmark.z])
+        # Fill x, y, z of all 21 landmarks for up to 2 hands
+        for i, hand_landmarks in enumerate(results.multi_hand_landmarks[:2]):
+            landmarks[i * 63:(i + 1) * 63] = hand_to_array(hand_landmarks)
         
-        # Pad with zeros if only one hand detected (63 features per hand)
-        while len(landmarks) < 126:
-            landmarks.append(0.0)
-        
-        # Normalize the landmarks
-        landmarks_array = np.array(landmarks[:126])
-        normalized = normalize_landmarks(landmarks_array)
-        
-        return normalized
+        # Normalize in place (the buffer is new for every call)
+        return _subtract_wrists(landmarks)
     
     return None
 
 
+def hand_to_array(hand_landmarks):
+    """
+    Convert one hand's 21 MediaPipe landmarks to a flat float32 array.
+    
+    Args:
+        hand_landmarks: MediaPipe NormalizedLandmarkList
+    
+    Returns:
+        numpy array of shape (63,) with x, y, z per landmark
+    """
+    return np.fromiter(
+        (v for lm in hand_landmarks.landmark for v in (lm.x, lm.y, lm.z)),
+        dtype=np.float32,
+        count=63
+    )
+
+
+def _subtract_wrists(landmarks):
+    """Normalize a float32 (126,) landmark array to its wrists, in place."""
+    # View as (hand, landmark, xyz)
+    hands = landmarks.reshape(2, 21, 3)
+    
+    # Only normalize hands that have data (non-zero)
+    present = hands.reshape(2, 63).any(axis=1)
+    
+    # Subtract each hand's wrist (first landmark) from all its landmarks
+    hands -= hands[:, 0:1, :] * present[:, None, None]
+    
+    return landmarks
+
+
 def normalize_landmarks(landmarks):
     """
     Normalize landmarks relative to wrist position.
@@ -58,29 +140,9 @@ def normalize_landmarks(landmarks):
         landmarks: numpy array of shape (126,) containing raw landmark coordinates
     
     Returns:
-        Normalized numpy array of shape (126,)
-    """
-    landmarks = landmarks.copy()
-    
-    # Normalize each hand separately (first 63, then next 63)
-    for hand_idx in range(2):
-        start_idx = hand_idx * 63
-        end_idx = start_idx + 63
-        
-        # Check if this hand has data (non-zero)
-        if np.any(landmarks[start_idx:end_idx]):
-            # Get wrist coordinates (first landmark of each hand)
-            wrist_x = landmarks[start_idx]
-            wrist_y = landmarks[start_idx + 1]
-            wrist_z = landmarks[start_idx + 2]
-            
-            # Normalize all landmarks relative to wrist
-            for i in range(start_idx, end_idx, 3):
-                landmarks[i] -= wrist_x      # x coordinate
-                landmarks[i + 1] -= wrist_y  # y coordinate
-                landmarks[i + 2] -= wrist_z  # z coordinate
-    
-    return landmarks
+        Normalized float32 numpy array of shape (126,); the input is not modified
+    """
+    return _subtract_wrists(np.array(landmarks, dtype=np.float32).reshape(126))
 
 
 def load_model_and_labels(model_path, labels_path):
@@ -94,32 +156,90 @@ def load_model_and_labels(model_path, labels_path):
     Returns:
         Tuple of (model, labels)
     """
+    from tensorflow import keras
+    
     model = keras.models.load_model(model_path)
     labels = np.load(labels_path, allow_pickle=True)
     return model, labels
 
 
-def load_tflite_model(model_path):
+# Cached input/output tensor details per TFLite interpreter (weak keys,
+# so discarded interpreters can still be freed)
+_TFLITE_IO = weakref.WeakKeyDictionary()
+
+
+def _tflite_io(interpreter):
+    """Return cached (input_details, output_details) for an interpreter."""
+    io = _TFLITE_IO.get(interpreter)
+    if io is None:
+        io = (interpreter.get_input_details()[0], interpreter.get_output_details()[0])
+        _TFLITE_IO[interpreter] = io
+    return io
+
+
+def load_tflite_model(model_path, num_threads=None):
     """
     Load TensorFlow Lite model for Raspberry Pi.
     
+    Uses the lightweight tflite_runtime package when it is installed and
+    falls back to full TensorFlow otherwise. Both enable the built-in
+    XNNPACK delegate by default, which provides NEON kernels for float and
+    INT8 models on ARM; it honours num_threads.
+    
     Args:
         model_path: Path to .tflite model file
+        num_threads: Number of CPU threads for the interpreter
+            (defaults to all cores)
     
     Returns:
         TFLite Interpreter object
     """
-    import tensorflow as tf
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        import tensorflow as tf
+        Interpreter = tf.lite.Interpreter
     
-    interpreter = tf.lite.Interpreter(model_path=model_path)
+    if num_threads is None:
+        num_threads = os.cpu_count() or 1
+    
+    interpreter = Interpreter(model_path=model_path, num_threads=num_threads)
     interpreter.allocate_tensors()
+    _tflite_io(interpreter)
     return interpreter
 
 
+def _run_tflite(interpreter, input_data):
+    """Write (and quantize, if needed) the input in place, then invoke."""
+    input_details, _ = _tflite_io(interpreter)
+    
+    # Writable view of the input tensor; filling it directly skips the
+    # extra copy set_tensor makes. Like the output view it must be
+    # released before invoke().
+    input_view = interpreter.tensor(input_details['index'])()
+    input_data = np.asarray(input_data, dtype=np.float32).reshape(input_view.shape)
+    
+    input_dtype = input_details['dtype']
+    if input_dtype != np.float32:
+        scale, zero_point = input_details['quantization']
+        info = np.iinfo(input_dtype)
+        input_data = np.clip(np.round(input_data / scale + zero_point),
+                             info.min, info.max)
+    
+    np.copyto(input_view, input_data, casting='unsafe')
+    del input_view
+    
+    interpreter.invoke()
+
+
 def predict_tflite(interpreter, input_data):
     """
     Run inference using TFLite interpreter.
     
+    Handles both float and full-integer quantized models: for quantized
+    models the input is quantized and the output dequantized using the
+    tensors' scale and zero point.
+    
     Args:
         interpreter: TFLite Interpreter object
         input_data: Input numpy array
@@ -127,22 +247,49 @@ def predict_tflite(interpreter, input_data):
     Returns:
         Prediction probabilities array
     """
-    # Get input and output tensors
-    input_details = interpreter.get_input_details()
-    output_details = interpreter.get_output_details()
+    _run_tflite(interpreter, input_data)
     
-    # Prepare input
-    input_data = np.array(input_data, dtype=np.float32).reshape(1, -1)
+    # Get output
+    _, output_details = _tflite_io(interpreter)
+    output_data = interpreter.get_tensor(output_details['index'])[0]
     
-    # Set input tensor
-    interpreter.set_tensor(input_details[0]['index'], input_data)
+    if output_details['dtype'] != np.float32:
+        scale, zero_point = output_details['quantization']
+        output_data = (output_data.astype(np.float32) - zero_point) * scale
     
-    # Run inference
-    interpreter.invoke()
+    return output_data
+
+
+def predict_tflite_top1(interpreter, input_data):
+    """
+    Run inference and return only the most likely class.
     
-    # Get output
-    output_data = interpreter.get_tensor(output_details[0]['index'])
-    return output_data[0]
+    Reads the output through a zero-copy tensor view and dequantizes just
+    the winning score, avoiding a per-frame copy of the output array.
+    
+    Args:
+        interpreter: TFLite Interpreter object
+        input_data: Input numpy array
+    
+    Returns:
+        Tuple of (class_index, confidence)
+    """
+    _run_tflite(interpreter, input_data)
+    
+    _, output_details = _tflite_io(interpreter)
+    
+    # The view must not outlive this call: TFLite refuses to invoke while
+    # references into its tensor arena are held
+    output = interpreter.tensor(output_details['index'])()[0]
+    max_idx = int(output.argmax())
+    score = output[max_idx]
+    del output
+    
+    if output_details['dtype'] != np.float32:
+        scale, zero_point = output_details['quantization']
+        return max_idx, float((int(score) - zero_point) * scale)
+    
+    return max_idx, float(score)
 
 
 def get_sign_text(prediction, labels, threshold=0.7):
@@ -166,31 +313,347 @@ def get_sign_text(prediction, labels, threshold=0.7):
     return None, float(confidence)
 
 
-def draw_landmarks_on_frame(frame, hands):
+def draw_landmarks_on_frame(frame, results):
     """
     Draw MediaPipe hand landmarks on frame.
     
     Args:
         frame: Input frame (BGR image)
-        hands: MediaPipe Hands solution object
+        results: MediaPipe results for this frame (see process_frame)
     
     Returns:
         Frame with landmarks drawn
     """
-    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    results = hands.process(frame_rgb)
-    
     if results.multi_hand_landmarks:
-        mp_drawing = mp.solutions.drawing_utils
-        mp_hands = mp.solutions.hands
-        
         for hand_landmarks in results.multi_hand_landmarks:
-            mp_drawing.draw_landmarks(
+            _MP_DRAWING.draw_landmarks(
                 frame,
                 hand_landmarks,
-                mp_hands.HAND_CONNECTIONS,
-                mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2, circle_radius=2),
-                mp_drawing.DrawingSpec(color=(255, 0, 0), thickness=2)
+                _HAND_CONNECTIONS,
+                _LANDMARK_SPEC,
+                _CONNECTION_SPEC
             )
     
     return frame
+
+
+class LatestFrame:
+    """
+    Background camera reader that keeps only the newest frame.
+    
+    A daemon thread calls source.read() continuously and stores the result
+    in a single slot, overwriting any frame the consumer has not taken yet,
+    so the main loop never works on a stale, queued frame. If the source
+    keeps failing for fail_after seconds, or raises, the thread gives up
+    and sets failed (and error, for an exception).
+    """
+    
+    def __init__(self, source, fail_after=10.0):
+        """
+        Args:
+            source: Object with a cv2.VideoCapture-style read() method
+                returning (ret, frame)
+            fail_after: Seconds of consecutive failed reads (or of waiting
+                for the first frame) before the camera is considered failed
+        """
+        self.source = source
+        self.fail_after = fail_after
+        self.lock = threading.Lock()
+        self.new_frame = threading.Event()
+        self.frame = None
+        self.failed = False
+        self.error = None
+        self.running = False
+        self.thread = None
+    
+    def start(self):
+        """Start the capture thread."""
+        self.running = True
+        self.thread = threading.Thread(target=self._update, daemon=True)
+        self.thread.start()
+        return self
+    
+    def _update(self):
+        """Capture loop run on the background thread."""
+        last_frame_time = time.monotonic()
+        
+        try:
+            while self.running:
+                ret, frame = self.source.read()
+                if not ret:
+                    if time.monotonic() - last_frame_time > self.fail_after:
+                        self.failed = True
+                        break
+                    time.sleep(0.01)  # Avoid spinning on a failing camera
+                    continue
+                last_frame_time = time.monotonic()
+                
+                # Set the event under the lock so it can never be left set
+                # for a slot the consumer has already emptied
+                with self.lock:
+                    self.frame = frame
+                    self.new_frame.set()
+        except Exception as e:
+            # Surface the error to the consumer instead of dying silently
+            self.error = e
+            self.failed = True
+    
+    def read(self, timeout=1.0):
+        """
+        Take the newest frame, waiting up to timeout seconds for one.
+        
+        Returns:
+            Tuple of (ret, frame) like cv2.VideoCapture.read(); ret is False
+            if no new frame arrived in time, which is only fatal once
+            failed is set
+        """
+        if not self.new_frame.wait(timeout):
+            return False, None
+        with self.lock:
+            frame = self.frame
+            self.frame = None
+            self.new_frame.clear()
+        return frame is not None, frame
+    
+    def stop(self):
+        """
+        Stop the capture thread (the source is not released).
+        
+        Waits for the thread to exit without a timeout, so the source is no
+        longer being read once this returns and can be released safely.
+        """
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+
+
+class HandTracker:
+    """
+    Background MediaPipe hand tracking stage.
+    
+    A daemon thread takes frames from a LatestFrame-style source, optionally
+    downscales and mirrors them, and runs hands.process, so tracking of one
+    frame overlaps with classification and rendering of the previous one on
+    the main thread (MediaPipe releases the GIL while its graph runs).
+    Finished results go into a small queue; when the consumer falls behind
+    the oldest result is dropped. If tracking raises, the thread stops and
+    sets failed and error.
+    """
+    
+    def __init__(self, source, hands, process_width=None, mirror=False):
+        """
+        Args:
+            source: Object with a read() method returning (ret, frame)
+            hands: MediaPipe Hands solution object (or AsyncHandLandmarker)
+            process_width: Width of the frame passed to MediaPipe (aspect
+                ratio is preserved); None processes full frames
+            mirror: Whether to flip the processed frame horizontally
+        """
+        self.source = source
+        self.hands = hands
+        self.process_width = process_width
+        self.mirror = mirror
+        self.results = queue.Queue(maxsize=2)
+        self.failed = False
+        self.error = None
+        self.running = False
+        self.thread = None
+    
+    def start(self):
+        """Start the tracking thread."""
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+    
+    def _run(self):
+        """Tracking loop run on the background thread."""
+        # Buffers are only touched on this thread (MediaPipe copies its
+        # input), so they can be reused for every frame
+        small = None
+        mirrored = None
+        last_results = None
+        
+        try:
+            while self.running:
+                ret, frame = self.source.read()
+                if not ret:
+                    continue
+                
+                image = frame
+                if self.process_width:
+                    height, width = frame.shape[:2]
+                    small = cv2.resize(
+                        frame, (self.process_width, self.process_width * height // width),
+                        small, interpolation=cv2.INTER_AREA
+                    )
+                    image = small
+                if self.mirror:
+                    mirrored = cv2.flip(image, 1, mirrored)
+                    image = mirrored
+                
+                results, landmarks = process_frame(image, self.hands)
+                
+                # AsyncHandLandmarker returns the same results object until a
+                # new detection finishes; queue each detection only once so it
+                # is not classified (and counted towards stability) twice
+                if results is last_results:
+                    continue
+                last_results = results
+                
+                # Drop the oldest result rather than block the tracker
+                item = (frame, landmarks, results)
+                while True:
+                    try:
+                        self.results.put_nowait(item)
+                        break
+                    except queue.Full:
+                        try:
+                            self.results.get_nowait()
+                        except queue.Empty:
+                            pass
+        except Exception as e:
+            # Surface the error to the consumer instead of dying silently
+            self.error = e
+            self.failed = True
+    
+    def read(self, timeout=1.0):
+        """
+        Take the next tracked frame, waiting up to timeout seconds.
+        
+        Returns:
+            Tuple of (ret, frame, landmarks, results) where frame is the
+            original (unmirrored, full size) frame, landmarks the normalized
+            (126,) array or None, and results the raw MediaPipe output;
+            ret is False if nothing arrived in time
+        """
+        try:
+            frame, landmarks, results = self.results.get(timeout=timeout)
+        except queue.Empty:
+            return False, None, None, None
+        return True, frame, landmarks, results
+    
+    def stop(self):
+        """
+        Stop the tracking thread (the source and hands are not closed).
+        
+        Waits for the thread to exit without a timeout, so hands is no
+        longer in use once this returns and can be closed safely.
+        """
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+
+
+class HUDCache:
+    """
+    Cached overlay for on-screen text and shapes.
+    
+    cv2.putText is slow, so the HUD is rendered onto a black layer only when
+    its key (the values it displays) changes. Every frame, the non-black
+    pixels of that layer are copied onto the frame region.
+    """
+    
+    def __init__(self):
+        self.key = None
+        self.layer = None
+        self.mask = None
+    
+    def draw(self, region, key, render):
+        """
+        Draw the cached HUD onto a frame region, re-rendering if needed.
+        
+        Args:
+            region: Frame slice (a view) to draw onto
+            key: Hashable summary of the HUD content
+            render: Callable that draws the HUD onto a black layer shaped
+                like region; only called when key changes
+        
+        Returns:
+            The region with the HUD drawn
+        """
+        if self.layer is None or self.layer.shape != region.shape or key != self.key:
+            self.layer = np.zeros_like(region)
+            render(self.layer)
+            self.mask = self.layer.any(axis=2, keepdims=True)
+            self.key = key
+        
+        np.copyto(region, self.layer, where=self.mask)
+        return region
+
+
+class AsyncHandLandmarker:
+    """
+    MediaPipe Tasks HandLandmarker running in LIVE_STREAM mode.
+    
+    Drop-in replacement for mp.solutions.hands.Hands: process() submits the
+    frame with detect_async and immediately returns the newest finished
+    result, so hand tracking runs on MediaPipe's own thread instead of
+    blocking the capture/UI loop. Results are converted to the solutions
+    format (multi_hand_landmarks), so extract_landmarks and
+    draw_landmarks_on_frame work unchanged.
+    
+    Every finished detection produces a new results object, and process()
+    keeps returning that same object until the next one arrives, so callers
+    can tell a new detection from a repeated one by identity.
+    """
+    
+    def __init__(self, model_path, num_hands=2, min_detection_confidence=0.5,
+                 min_tracking_confidence=0.5):
+        """
+        Args:
+            model_path: Path to hand_landmarker.task model bundle
+            num_hands: Maximum number of hands to detect
+            min_detection_confidence: Minimum palm detection confidence
+            min_tracking_confidence: Minimum hand tracking confidence
+        """
+        from mediapipe.tasks import python as mp_python
+        from mediapipe.tasks.python import vision
+        
+        self.lock = threading.Lock()
+        self.results = SimpleNamespace(multi_hand_landmarks=None)
+        self.last_timestamp = 0
+        
+        options = vision.HandLandmarkerOptions(
+            base_options=mp_python.BaseOptions(model_asset_path=model_path),
+            running_mode=vision.RunningMode.LIVE_STREAM,
+            num_hands=num_hands,
+            min_hand_detection_confidence=min_detection_confidence,
+            min_tracking_confidence=min_tracking_confidence,
+            result_callback=self._on_result
+        )
+        self.landmarker = vision.HandLandmarker.create_from_options(options)
+    
+    def _on_result(self, result, output_image, timestamp_ms):
+        """Store the newest result (called on MediaPipe's thread)."""
+        hand_lists = [
+            landmark_pb2.NormalizedLandmarkList(landmark=[
+                landmark_pb2.NormalizedLandmark(x=lm.x, y=lm.y, z=lm.z)
+                for lm in hand
+            ])
+            for hand in result.hand_landmarks
+        ]
+        
+        with self.lock:
+            self.results = SimpleNamespace(multi_hand_landmarks=hand_lists or None)
+    
+    def process(self, frame_rgb):
+        """
+        Submit an RGB frame and return the newest available result.
+        
+        The returned result may belong to an earlier frame while the
+        submitted one is still in flight.
+        """
+        # LIVE_STREAM mode requires strictly increasing timestamps
+        timestamp = max(int(time.monotonic() * 1000), self.last_timestamp + 1)
+        self.last_timestamp = timestamp
+        
+        image = mp.Image(image_format=mp.ImageFormat.SRGB, data=frame_rgb)
+        self.landmarker.detect_async(image, timestamp)
+        
+        with self.lock:
+            return self.results
+    
+    def close(self):
+        """Release the landmarker."""
+        self.landmarker.close()
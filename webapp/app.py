@@ -4,19 +4,36 @@ Provides mobile interface for Bluetooth pairing, settings, data collection, and
 """
 
 from flask import Flask, render_template, request, jsonify, send_file
+from flask.json.provider import DefaultJSONProvider
 from flask_socketio import SocketIO, emit
 import subprocess
 import json
 import os
-import time
-import threading
 import sys
 import signal
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Add src to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
 
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider using orjson for faster API responses."""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
 app = Flask(__name__)
+if orjson is not None:
+    app.json = OrjsonProvider(app)
 app.config['SECRET_KEY'] = 'smart-glasses-secret-key'
 socketio = SocketIO(app, cors_allowed_origins="*", async_mode='eventlet')
 
@@ -32,28 +49,45 @@ app_state = {
     'battery_level': 100  # Placeholder
 }
 
+# Parsed config.json and the mtime it was read at
+config_cache = {'mtime': None, 'data': {}}
+
+# Sample counts per CSV: {path: ((mtime_ns, size), num_samples)}
+sample_count_cache = {}
+
 
 def load_config():
-    """Load configuration from config.json."""
+    """Load configuration from config.json (cached until the file changes)."""
     config_path = 'config.json'
-    if os.path.exists(config_path):
+    try:
+        mtime = os.stat(config_path).st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    
+    if config_cache['mtime'] != mtime:
         with open(config_path, 'r') as f:
-            return json.load(f)
-    return {}
+            config_cache['data'] = json.load(f)
+        config_cache['mtime'] = mtime
+    
+    # Callers may modify the result, so hand out a copy
+    return dict(config_cache['data'])
 
 
 def save_config(config):
     """Save configuration to config.json."""
     with open('config.json', 'w') as f:
         json.dump(config, f, indent=2)
+    
+    config_cache['data'] = dict(config)
+    config_cache['mtime'] = os.stat('config.json').st_mtime_ns
 
 
 def run_command(command, timeout=10):
-    """Run a shell command and return output."""
+    """Run a command (argv list, no shell) and return output."""
     try:
         result = subprocess.run(
             command,
-            shell=True,
+            shell=False,
             capture_output=True,
             text=True,
             timeout=timeout
@@ -65,6 +99,24 @@ def run_command(command, timeout=10):
         return False, "", str(e)
 
 
+def count_lines(filepath, chunk_size=1 << 20):
+    """Count lines in a file by scanning raw bytes in large chunks."""
+    lines = 0
+    last = b'\n'
+    with open(filepath, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            lines += chunk.count(b'\n')
+            last = chunk[-1:]
+    
+    # A final line without a trailing newline still counts
+    if last != b'\n':
+        lines += 1
+    return lines
+
+
 # ============= Routes =============
 
 @app.route('/')
@@ -126,8 +178,13 @@ def start_inference():
         if not os.path.exists(script_path):
             script_path = 'src/inference.py'
         
+        # No display is attached when launched from the web app
+        command = ['python3', script_path]
+        if script_path == 'src/inference.py':
+            command.append('--headless')
+        
         inference_process = subprocess.Popen(
-            ['python3', script_path],
+            command,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
             text=True
@@ -136,7 +193,7 @@ def start_inference():
         app_state['inference_running'] = True
         
         # Monitor process in background
-        threading.Thread(target=monitor_inference, daemon=True).start()
+        socketio.start_background_task(monitor_inference)
         
         return jsonify({'success': True, 'message': 'Inference started'})
     
@@ -172,7 +229,7 @@ def monitor_inference():
         # In a real implementation, you would parse logs or use IPC
         # For now, just emit status updates
         socketio.emit('inference_update', app_state)
-        time.sleep(1)
+        socketio.sleep(1)
     
     app_state['inference_running'] = False
     socketio.emit('inference_update', app_state)
@@ -183,7 +240,7 @@ def bluetooth_scan():
     """Scan for Bluetooth devices."""
     try:
         # Use bluetoothctl to scan
-        success, stdout, stderr = run_command('bluetoothctl devices', timeout=10)
+        success, stdout, stderr = run_command(['bluetoothctl', 'devices'], timeout=10)
         
         if success:
             devices = []
@@ -215,7 +272,7 @@ def bluetooth_pair():
     
     try:
         # Pair with device
-        success, stdout, stderr = run_command(f'bluetoothctl pair {mac}', timeout=30)
+        success, stdout, stderr = run_command(['bluetoothctl', 'pair', mac], timeout=30)
         
         if success or 'AlreadyExists' in stderr:
             return jsonify({'success': True, 'message': 'Device paired'})
@@ -236,7 +293,7 @@ def bluetooth_trust():
         return jsonify({'success': False, 'message': 'No MAC address provided'})
     
     try:
-        success, stdout, stderr = run_command(f'bluetoothctl trust {mac}', timeout=10)
+        success, stdout, stderr = run_command(['bluetoothctl', 'trust', mac], timeout=10)
         
         if success:
             return jsonify({'success': True, 'message': 'Device trusted'})
@@ -257,7 +314,7 @@ def bluetooth_connect():
         return jsonify({'success': False, 'message': 'No MAC address provided'})
     
     try:
-        success, stdout, stderr = run_command(f'bluetoothctl connect {mac}', timeout=20)
+        success, stdout, stderr = run_command(['bluetoothctl', 'connect', mac], timeout=20)
         
         if success or 'Connected: yes' in stdout:
             return jsonify({'success': True, 'message': 'Device connected'})
@@ -278,7 +335,7 @@ def bluetooth_disconnect():
         return jsonify({'success': False, 'message': 'No MAC address provided'})
     
     try:
-        success, stdout, stderr = run_command(f'bluetoothctl disconnect {mac}', timeout=10)
+        success, stdout, stderr = run_command(['bluetoothctl', 'disconnect', mac], timeout=10)
         
         if success:
             return jsonify({'success': True, 'message': 'Device disconnected'})
@@ -320,9 +377,13 @@ def reset_settings():
             'camera_height': 480,
             'pi_camera_width': 320,
             'pi_camera_height': 240,
+            'motion_threshold': 2.0,
+            'motion_max_skip': 5,
             'model_path': 'models/isl_model.keras',
-            'tflite_model_path': 'models/isl_model.tflite',
+            'tflite_model_path': 'models/isl_model_int8.tflite',
+            'tflite_threads': 2,
             'labels_path': 'models/labels.npy',
+            'hand_landmarker_path': 'models/hand_landmarker.task',
             'data_dir': 'data',
             'log_file': 'logs/smart_glasses.log'
         }
@@ -378,9 +439,16 @@ def list_collected():
                 sign_name = filename.replace('.csv', '')
                 filepath = os.path.join(data_dir, filename)
                 
-                # Count lines in CSV (subtract 1 for header)
-                with open(filepath, 'r') as f:
-                    num_samples = sum(1 for line in f) - 1
+                # Count lines in CSV (subtract 1 for header), only
+                # recounting when the file has changed
+                st = os.stat(filepath)
+                key = (st.st_mtime_ns, st.st_size)
+                cached = sample_count_cache.get(filepath)
+                if cached and cached[0] == key:
+                    num_samples = cached[1]
+                else:
+                    num_samples = count_lines(filepath) - 1
+                    sample_count_cache[filepath] = (key, num_samples)
                 
                 signs.append({
                     'name': sign_name,
@@ -405,13 +473,11 @@ def start_training():
         training_process = subprocess.Popen(
             ['python3', 'src/train_model.py'],
             stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            bufsize=1
+            stderr=subprocess.STDOUT
         )
         
         # Monitor training in background
-        threading.Thread(target=monitor_training, daemon=True).start()
+        socketio.start_background_task(monitor_training, training_process)
         
         return jsonify({'success': True, 'message': 'Training started'})
     
@@ -419,30 +485,58 @@ def start_training():
         return jsonify({'success': False, 'message': str(e)})
 
 
-def monitor_training():
+def monitor_training(process):
     """Monitor training process and emit progress via SocketIO."""
-    global training_process
+    # Non-blocking reads so waiting for output never blocks the eventlet hub
+    fd = process.stdout.fileno()
+    os.set_blocking(fd, False)
+    pending = b''
+    
+    while True:
+        try:
+            chunk = os.read(fd, 4096)
+        except BlockingIOError:
+            # No output yet, yield to other tasks
+            socketio.sleep(0.1)
+            continue
+        
+        if not chunk:
+            # EOF: the training process has exited
+            break
+        
+        *lines, pending = (pending + chunk).split(b'\n')
+        for line in lines:
+            message = line.decode('utf-8', errors='replace').strip()
+            if message:
+                socketio.emit('training_progress', {'message': message})
     
-    while training_process and training_process.poll() is None:
-        line = training_process.stdout.readline()
-        if line:
-            socketio.emit('training_progress', {'message': line.strip()})
+    message = pending.decode('utf-8', errors='replace').strip()
+    if message:
+        socketio.emit('training_progress', {'message': message})
     
     # Training complete
+    process.wait()
     socketio.emit('training_complete', {'message': 'Training finished'})
 
 
 @app.route('/api/logs/get', methods=['GET'])
 def get_logs():
-    """Get application logs."""
+    """Get the tail (last 64 KB) of the application log."""
     try:
         log_file = 'logs/smart_glasses.log'
+        tail_bytes = 64 * 1024
         
         if os.path.exists(log_file):
-            with open(log_file, 'r') as f:
-                logs = f.read()
+            size = os.path.getsize(log_file)
+            with open(log_file, 'rb') as f:
+                f.seek(max(0, size - tail_bytes))
+                logs = f.read().decode('utf-8', errors='replace')
+            
+            # Drop the partial first line when starting mid-file
+            if size > tail_bytes:
+                logs = logs.partition('\n')[2]
             
-            return jsonify({'success': True, 'logs': logs})
+            return jsonify({'success': True, 'logs': logs, 'truncated': size > tail_bytes})
         else:
             return jsonify({'success': True, 'logs': 'No logs available'})
     
@@ -450,6 +544,17 @@ def get_logs():
         return jsonify({'success': False, 'message': str(e)})
 
 
+@app.route('/api/logs/download', methods=['GET'])
+def download_logs():
+    """Download the full application log (supports Range requests)."""
+    log_file = 'logs/smart_glasses.log'
+    
+    if not os.path.exists(log_file):
+        return jsonify({'success': False, 'message': 'No logs available'}), 404
+    
+    return send_file(os.path.abspath(log_file), mimetype='text/plain', conditional=True)
+
+
 # ============= SocketIO Events =============
 
 @socketio.on('connect')